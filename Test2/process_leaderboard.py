@@ -15,75 +15,173 @@ Outputs:
 from __future__ import annotations
 
 import argparse
+import csv
+import hashlib
 import json
+import keyword
+import math
 import os
+import pickle
 import re
+import sys
+import tempfile
 import zipfile
-import xml.etree.ElementTree as ET
-from typing import List, Dict, Optional, Any
-from functools import cmp_to_key
-from collections import Counter
-
-
-def parse_xlsx_to_rows(path: str) -> List[Dict[str, Optional[str]]]:
-    """Return rows as list of dicts keyed by column letter (A, B, C...).
-
-    The first row corresponds to index 0 and usually holds headers.
-    """
-    with zipfile.ZipFile(path) as z:
-        namelist = z.namelist()
-        if 'xl/sharedStrings.xml' in namelist:
-            ss_root = ET.fromstring(z.read('xl/sharedStrings.xml'))
-            shared = [
-                ''.join([t.text or '' for t in si.findall('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}t')])
-                for si in ss_root.findall('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}si')
-            ]
-        else:
-            shared = []
-
-        sheet_name = 'xl/worksheets/sheet1.xml'
-        if sheet_name not in namelist:
-            raise FileNotFoundError(f"{sheet_name} not found in {path}")
-
-        sheet_root = ET.fromstring(z.read(sheet_name))
-        ns = {'ns': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
-        rows: List[Dict[str, Optional[str]]] = []
-        for r in sheet_root.findall('.//ns:row', ns):
+from dataclasses import make_dataclass
+from typing import List, Dict, Optional, Any, Iterable, Iterator, IO, Union
+from itertools import groupby
+
+try:
+    # lxml parses XLSX XML an order of magnitude faster than the stdlib
+    from lxml import etree as ET
+except ImportError:  # pragma: no cover - optional dependency
+    import xml.etree.ElementTree as ET
+
+try:
+    import zstandard as zstd
+except ImportError:  # pragma: no cover - optional dependency
+    zstd = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+_HAVE_LXML = hasattr(ET, 'LXML_VERSION')
+# lxml < 5 expands external entities by default; the workbook is untrusted
+# input, so never let it pull in local files or fetch URLs
+_ITERPARSE_OPTS = {'resolve_entities': False, 'no_network': True} if _HAVE_LXML else {}
+
+# Clark-notation tag names for the SpreadsheetML namespace
+_SS_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+SS_SI = _SS_NS + 'si'
+SS_T = _SS_NS + 't'
+NS_SHEET_DATA = _SS_NS + 'sheetData'
+NS_ROW = _SS_NS + 'row'
+NS_C = _SS_NS + 'c'
+NS_V = _SS_NS + 'v'
+NS_IS = _SS_NS + 'is'
+
+# Patterns used per header, compiled once
+_ROUND_RE = re.compile(r'^R\d{2}$').match
+_SPEND_RE = re.compile(r'spend|spent|\$m|\$|spent', re.I).search
+
+
+def _iter_rows(source: IO[bytes]) -> Iterator[Any]:
+    """Stream `<row>` elements from a worksheet, freeing each once consumed."""
+    if _HAVE_LXML:
+        for _, row in ET.iterparse(source, events=('end',), tag=NS_ROW, **_ITERPARSE_OPTS):
+            yield row
+            row.clear()
+            # drop already-processed siblings so the tree never grows
+            while row.getprevious() is not None:
+                del row.getparent()[0]
+    else:
+        # the stdlib has no getparent(); remember <sheetData> when it opens
+        # and detach each finished row from it
+        sheet_data = None
+        for event, el in ET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                if el.tag == NS_SHEET_DATA:
+                    sheet_data = el
+            elif el.tag == NS_ROW:
+                yield el
+                el.clear()
+                if sheet_data is not None:
+                    sheet_data.remove(el)
+
+
+def _read_shared_strings(source: IO[bytes]) -> tuple:
+    """Decode `sharedStrings.xml` into a tuple in a single streaming pass."""
+    result: List[str] = []
+    current: List[str] = []
+    for _, el in ET.iterparse(source, events=('end',), **_ITERPARSE_OPTS):
+        if el.tag == SS_T:
+            current.append(el.text or '')
+        elif el.tag == SS_SI:
+            result.append(''.join(current))
+            current.clear()
+            el.clear()
+    return tuple(result)
+
+
+def _iter_sheet_rows(z: zipfile.ZipFile) -> Iterator[Dict[str, Optional[str]]]:
+    """Yield rows of the first worksheet of an already-open XLSX archive."""
+    namelist = z.namelist()
+    if 'xl/sharedStrings.xml' in namelist:
+        with z.open('xl/sharedStrings.xml') as fh:
+            shared = _read_shared_strings(fh)
+    else:
+        shared = ()
+
+    sheet_name = 'xl/worksheets/sheet1.xml'
+    if sheet_name not in namelist:
+        raise FileNotFoundError(f"{sheet_name} not found in {z.filename}")
+
+    with z.open(sheet_name) as fh:
+        for r in _iter_rows(fh):
             row_cells: Dict[str, Optional[str]] = {}
-            for c in r.findall('ns:c', ns):
+            for c in r:
+                if c.tag != NS_C:
+                    continue
                 ref = c.get('r')  # like A1, B2
-                m = re.match(r'([A-Z]+)', ref)
-                col = m.group(1) if m else ref
+                # column letters are the leading run of non-digits
+                i = 0
+                while i < len(ref) and ref[i] > '9':
+                    i += 1
+                col = ref[:i] or ref
                 t = c.get('t')
-                v = c.find('ns:v', ns)
+                v = c.find(NS_V)
                 val: Optional[str] = None
                 if v is not None and v.text is not None:
                     text = v.text
                     if t == 's':
-                        idx = int(text)
-                        val = shared[idx] if 0 <= idx < len(shared) else text
+                        try:
+                            idx = int(text)
+                            val = shared[idx] if idx >= 0 else text
+                        except (IndexError, ValueError):
+                            val = text
                     else:
                         val = text
                 else:
-                    is_elem = c.find('ns:is', ns)
+                    is_elem = c.find(NS_IS)
                     if is_elem is not None:
-                        t_e = is_elem.find('.//ns:t', ns)
+                        t_e = next(is_elem.iter(SS_T), None)
                         if t_e is not None:
                             val = t_e.text
                 row_cells[col] = val
-            rows.append(row_cells)
+            yield row_cells
+
 
-        return rows
+def parse_xlsx_to_rows(source: Union[str, zipfile.ZipFile]) -> Iterator[Dict[str, Optional[str]]]:
+    """Yield rows as dicts keyed by column letter (A, B, C...).
+
+    `source` is a path or an open `zipfile.ZipFile`; pass the latter to
+    reuse an archive whose central directory has already been read.
+    The first row yielded usually holds headers. Members are decompressed
+    and parsed as a stream, so only one row is held in memory at a time.
+    """
+    if isinstance(source, zipfile.ZipFile):
+        yield from _iter_sheet_rows(source)
+    else:
+        with zipfile.ZipFile(source) as z:
+            yield from _iter_sheet_rows(z)
+
+
+def _col_to_int(col: str, _ord=ord) -> int:
+    """Return the 1-based index of a column letter (A=1, Z=26, AA=27)."""
+    n = 0
+    for ch in col:
+        n = n * 26 + _ord(ch) - 64
+    return n
 
 
 def col_letter_range(start: str, end: str) -> List[str]:
     """Return list of column letters from start to end (inclusive)."""
-    def to_index(col: str) -> int:
-        res = 0
-        for ch in col:
-            res = res * 26 + (ord(ch) - 64)
-        return res
-
     def to_letter(idx: int) -> str:
         out = ''
         while idx > 0:
@@ -91,161 +189,377 @@ def col_letter_range(start: str, end: str) -> List[str]:
             out = chr(65 + rem) + out
         return out
 
-    return [to_letter(i) for i in range(to_index(start), to_index(end) + 1)]
+    return [to_letter(i) for i in range(_col_to_int(start), _col_to_int(end) + 1)]
 
 
-def normalize_rows(rows: List[Dict[str, Optional[str]]]) -> List[Dict[str, Any]]:
-    """Convert parsed rows into list of dicts keyed by header names.
+def normalize_columns(rows: Iterable[Dict[str, Optional[str]]]) -> Dict[str, List[Any]]:
+    """Convert parsed rows into a struct-of-arrays: header name -> column values.
+
+    `rows` may be any iterable (e.g. the generator from `parse_xlsx_to_rows`);
+    the first item is taken as the header row. Every column list has one
+    entry per data row, in sheet order.
 
     Heuristics used because spreadsheet has irregular headers:
     - The header row contains 'Pos' and 'Player' in first two columns.
     - Round columns are labeled like R01, R02, ...
     - Trailing columns include Total / Points / Spent ($m) / $m/Pt
     """
-    if not rows:
-        return []
+    it = iter(rows)
+    header_row = next(it, None)
+    if header_row is None:
+        return {}
 
-    header_row = rows[0]
     # Determine column letters in order
-    cols = sorted(header_row.keys(), key=lambda c: sum((ord(ch) - 64) * (26 ** i) for i, ch in enumerate(reversed(c))))
-    headers = [header_row.get(c) or f'COL_{c}' for c in cols]
-
-    # Build list of dicts mapping header->value
-    data = []
-    for r in rows[1:]:
-        rec: Dict[str, Any] = {}
-        for i, c in enumerate(cols):
-            h = headers[i]
+    cols = sorted(header_row, key=_col_to_int)
+    # every row dict shares these keys; interning lets dict lookups hit the
+    # pointer-equality fast path and keeps one copy of each header string
+    headers = [sys.intern(header_row.get(c) or f'COL_{c}') for c in cols]
+
+    # A repeated header keeps its first position but takes the value of its
+    # last occurrence, as a dict built cell by cell would
+    last = {h: c for h, c in zip(headers, cols)}
+    columns: Dict[str, List[Any]] = {h: [] for h in last}
+    targets = [(c, columns[h].append) for h, c in last.items()]
+
+    for r in it:
+        for c, append in targets:
             v = r.get(c)
             if v is None:
-                rec[h] = None
+                append(None)
                 continue
             v_str = str(v).strip()
             if v_str == '-' or v_str == '':
-                rec[h] = None
+                append(None)
                 continue
-            # try int
-            if re.fullmatch(r"-?\d+", v_str):
-                rec[h] = int(v_str)
+            # accept exactly -?\d+ as int and -?\d+\.\d+ as float, using str
+            # methods instead of regexes; '1e3', '1_000', '1.' and 'inf' stay text
+            digits = v_str[1:] if v_str[0] == '-' else v_str
+            if digits.isdecimal():
+                append(int(v_str))
                 continue
-            # try float
-            if re.fullmatch(r"-?\d+\.\d+", v_str):
-                try:
-                    rec[h] = float(v_str)
-                    continue
-                except Exception:
-                    pass
-            rec[h] = v_str
-        data.append(rec)
+            whole, dot, frac = digits.partition('.')
+            if dot and whole.isdecimal() and frac.isdecimal():
+                append(float(v_str))
+                continue
+            append(v_str)
+
+    return columns
+
+
+def _columns_to_rows(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    keys = list(columns)
+    return [dict(zip(keys, vals)) for vals in zip(*columns.values())]
+
+
+class _SlotRow:
+    """Dict-style access for the slotted row classes built by `_row_type`.
+
+    Lets `rank_rows` and the writers handle these rows and plain dicts alike.
+    """
+    __slots__ = ()
+    _fields: tuple = ()
+    # names readable as keys: the fields, never the methods
+    _names: frozenset = frozenset()
+
+    def keys(self) -> tuple:
+        return self._fields
 
-    return data
+    def items(self) -> List[tuple]:
+        return [(k, getattr(self, k)) for k in self._fields]
+
+    def get(self, k: str, default: Any = None) -> Any:
+        if k not in self._names:
+            return default
+        return getattr(self, k, default)
+
+    def pop(self, k: str, default: Any = None) -> Any:
+        if k not in self._names:
+            return default
+        v = getattr(self, k, default)
+        try:
+            delattr(self, k)
+        except AttributeError:
+            pass
+        return v
+
+    def __getitem__(self, k: str) -> Any:
+        if k not in self._names:
+            raise KeyError(k)
+        try:
+            return getattr(self, k)
+        except AttributeError:
+            raise KeyError(k) from None
+
+    def __setitem__(self, k: str, v: Any) -> None:
+        setattr(self, k, v)
+
+    def __contains__(self, k: str) -> bool:
+        return k in self._names and hasattr(self, k)
+
+
+# Fields `rank_rows` adds to every row
+_ROW_META = ('rank', 'tie_group', 'tie_highlight')
+
+
+def _row_type(keys: Iterable[str]) -> Optional[type]:
+    """Return a slotted dataclass with one field per key (plus rank metadata).
+
+    Returns None when a key cannot be used as a field name, e.g. a header
+    like 'Spent ($m)', or on Python < 3.10 where `make_dataclass` has no
+    `slots` option, so the caller can fall back to dicts.
+    """
+    if sys.version_info < (3, 10):
+        return None
+    names = list(dict.fromkeys([*keys, *_ROW_META]))
+    for k in names:
+        if not k.isidentifier() or keyword.iskeyword(k) or k.startswith('__') or hasattr(_SlotRow, k):
+            return None
+    cls = make_dataclass('Row', [(k, Any, None) for k in names], bases=(_SlotRow,), slots=True)
+    cls._fields = tuple(names)
+    cls._names = frozenset(names)
+    return cls
+
+
+def _build_rows(columns: Dict[str, List[Any]]) -> list:
+    """Materialize rows for ranking and output.
+
+    Uses slotted dataclass instances, which are several times smaller than
+    per-row dicts, whenever the column names allow it.
+    """
+    row_cls = _row_type(columns)
+    if row_cls is None:
+        return _columns_to_rows(columns)
+    return [row_cls(*vals) for vals in zip(*columns.values())]
+
+
+def _row_as_dict(o: Any) -> Dict[str, Any]:
+    """JSON `default` hook: serialize slotted rows under their header names."""
+    if isinstance(o, _SlotRow):
+        return dict(o.items())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def _json_value(v: Any) -> Any:
+    """Return `v` with non-finite floats replaced by None, for the stdlib encoder."""
+    if isinstance(v, float):
+        return v if math.isfinite(v) else None
+    if isinstance(v, tuple):
+        return [_json_value(x) for x in v]
+    return v
+
+
+def normalize_rows(rows: Iterable[Dict[str, Optional[str]]]) -> List[Dict[str, Any]]:
+    """Convert parsed rows into list of dicts keyed by header names.
+
+    Row-oriented view of `normalize_columns`, kept for callers that want
+    one dict per row.
+    """
+    return _columns_to_rows(normalize_columns(rows))
 
 
 def detect_round_columns(headers: List[str]) -> List[str]:
-    rounds = [h for h in headers if isinstance(h, str) and re.match(r'^R\d{2}$', h)]
+    rounds = [h for h in headers if isinstance(h, str) and _ROUND_RE(h)]
     if rounds:
         return rounds
     # fallback: detect repeated 'Pts' columns by position
     return [h for h in headers if h.startswith('R')]
 
 
-def run(input_path: str, out_dir: str) -> Dict[str, Any]:
-    os.makedirs(out_dir, exist_ok=True)
-    rows = parse_xlsx_to_rows(input_path)
-    norm = normalize_rows(rows)
-    if not norm:
-        raise RuntimeError('No data found in spreadsheet')
+# Bump when the cached (columns, round_cols) layout changes
+_CACHE_VERSION = 1
+
+# Output files are written through a 1 MiB buffer to batch small writes
+_WRITE_BUFFER = 1 << 20
+
+# Explicit total columns in order of preference
+_TOTAL_CANDIDATES = {'Total': 0, 'Pts': 1, 'Points': 2, 'TOTAL': 3}
 
-    headers = list(norm[0].keys())
-    # detect round columns
-    round_cols = [h for h in headers if re.match(r'^R\d{2}$', h)]
-    # fallback: common columns "Pts" occurrences
-    if not round_cols:
-        # try to find contiguous numeric columns after 'Player'
-        if 'Player' in headers:
-            idx = headers.index('Player')
-            possible = headers[idx + 1: idx + 1 + 30]
-            round_cols = [h for h in possible if any(isinstance(r[h], int) for r in norm if h in r and r[h] is not None)]
-
-    # compute totals from round columns
-    for r in norm:
-        if round_cols:
-            pts = 0
-            counted = 0
-            for rc in round_cols:
-                v = r.get(rc)
-                # Treat missing or dash/'D$Q' as zero for round scoring per spec
-                if v is None:
-                    val = 0
-                elif isinstance(v, (int, float)):
-                    val = v
-                else:
-                    try:
-                        val = float(str(v))
-                    except Exception:
-                        # non-numeric like 'D$Q' or '-' treat as zero
-                        val = 0
-                pts += val
-                # count only actual numeric entries (non-empty strings that parse)
-                counted += 1
-            r['computed_rounds_total'] = pts
-            r['computed_rounds_count'] = counted
-        else:
-            r['computed_rounds_total'] = None
-            r['computed_rounds_count'] = 0
-
-    # Determine canonical total column (prefer explicit total/pts if present)
-    total_col = None
-    for cand in ('Total', 'Pts', 'Points', 'TOTAL'):
-        if cand in headers:
-            total_col = cand
-            break
 
-    # Detect spending column heuristically
+def _classify_headers(headers: List[str], columns: Dict[str, List[Any]]) -> tuple:
+    """Return (round_cols, total_col, spend_col) from a single pass over headers."""
+    round_cols: List[str] = []
+    total_col = None
+    total_pref = len(_TOTAL_CANDIDATES)
     spend_col = None
     for h in headers:
-        if isinstance(h, str) and re.search(r'spend|spent|\$m|\$|spent', h, re.I):
+        if _ROUND_RE(h):
+            round_cols.append(h)
+        # canonical total column (prefer explicit total/pts if present)
+        pref = _TOTAL_CANDIDATES.get(h, total_pref)
+        if pref < total_pref:
+            total_col, total_pref = h, pref
+        # spending column, detected heuristically
+        if spend_col is None and isinstance(h, str) and _SPEND_RE(h):
             spend_col = h
-            break
 
-    # Build helper values for ranking
-    for r in norm:
+    # fallback: numeric columns after 'Player'; a column qualifies as soon
+    # as one int is seen, so each candidate stops at its first int
+    if not round_cols and 'Player' in headers:
+        idx = headers.index('Player')
+        possible = headers[idx + 1: idx + 1 + 30]
+        round_cols = [h for h in possible if any(isinstance(v, int) for v in columns[h])]
+
+    return round_cols, total_col, spend_col
+
+
+def _round_value(v: Any) -> Any:
+    """Return a round cell's contribution to the total; missing or non-numeric counts as 0."""
+    # Treat missing or dash/'D$Q' as zero for round scoring per spec
+    if v is None:
+        return 0
+    if isinstance(v, (int, float)):
+        return v
+    try:
+        return float(str(v))
+    except Exception:
+        # non-numeric like 'D$Q' or '-' treat as zero
+        return 0
+
+
+def _round_stats(columns: Dict[str, List[Any]], n: int, round_cols: List[str]) -> tuple:
+    """Return (computed_rounds_total, countback) lists, one entry per row.
+
+    Totals are summed left to right with Python numbers, so int-only rows
+    stay exact ints and rows with a float cell give a float. Countback is
+    each row's round scores as floats sorted descending (including
+    repeats); with numpy all rows are sorted in one call over a
+    rounds x rows matrix.
+    """
+    if not round_cols:
+        return [None] * n, [()] * n
+    values = [[_round_value(v) for v in columns[rc]] for rc in round_cols]
+    computed = [sum(row) for row in zip(*values)]
+
+    if np is not None:
+        mat = np.array(values, dtype=np.float64)
+        mat.sort(axis=0)
+        return computed, [tuple(row) for row in mat[::-1].T.tolist()]
+    return computed, [tuple(sorted(map(float, row), reverse=True)) for row in zip(*values)]
+
+
+def _rank_inputs(columns: Dict[str, List[Any]], computed: List[Any], total_col: Optional[str], spend_col: Optional[str]) -> tuple:
+    """Return (_rank_total, _rank_spend) lists, one entry per row."""
+    n = len(computed)
+    totals_in = columns[total_col] if total_col else [None] * n
+    spends_in = columns[spend_col] if spend_col else [None] * n
+    rank_totals: List[float] = []
+    rank_spends: List[float] = []
+    for i in range(n):
         # primary total: prefer explicit total if numeric, else computed_rounds_total
-        tot = None
-        if total_col and isinstance(r.get(total_col), (int, float)):
-            tot = r.get(total_col)
-        else:
-            tot = r.get('computed_rounds_total')
-        r['_rank_total'] = float(tot) if tot is not None else 0.0
+        tot = totals_in[i]
+        if not isinstance(tot, (int, float)):
+            tot = computed[i]
+        rank_totals.append(float(tot) if tot is not None else 0.0)
 
         # spending: parse to float if present, else treat as 0
-        spend_val = None
-        if spend_col and r.get(spend_col) is not None:
+        spend_val = 0.0
+        if (raw := spends_in[i]) is not None:
             try:
-                spend_val = float(str(r.get(spend_col)).replace(',', '').replace('$', ''))
+                spend_val = float(str(raw).replace(',', '').replace('$', ''))
             except Exception:
                 spend_val = 0.0
-        else:
-            spend_val = 0.0
-        r['_rank_spend'] = float(spend_val)
-
-        # countback list: sorted round scores descending (including repeats)
-        scores = []
-        for rc in round_cols:
-            v = r.get(rc)
-            if v is None:
-                sval = 0.0
-            elif isinstance(v, (int, float)):
-                sval = float(v)
-            else:
-                try:
-                    sval = float(str(v))
-                except Exception:
-                    sval = 0.0
-            scores.append(sval)
-        # sort descending
-        scores_sorted = sorted(scores, reverse=True)
-        r['_countback'] = scores_sorted
+        rank_spends.append(float(spend_val))
+
+    return rank_totals, rank_spends
+
+
+def _prepare_columns(input_path: str) -> tuple:
+    """Parse the workbook and derive the ranking columns; returns (columns, round_cols)."""
+    # keep the archive open for the whole parse so it is only indexed once
+    with zipfile.ZipFile(input_path) as z:
+        columns = normalize_columns(parse_xlsx_to_rows(z))
+    headers = list(columns)
+    n = len(columns[headers[0]]) if headers else 0
+    if not n:
+        raise RuntimeError('No data found in spreadsheet')
+
+    round_cols, total_col, spend_col = _classify_headers(headers, columns)
+
+    # compute totals from round columns and build helper values for ranking
+    computed, countbacks = _round_stats(columns, n, round_cols)
+    rank_totals, rank_spends = _rank_inputs(columns, computed, total_col, spend_col)
+    columns['computed_rounds_total'] = computed
+    columns['computed_rounds_count'] = [len(round_cols)] * n
+    columns['_rank_total'] = rank_totals
+    columns['_rank_spend'] = rank_spends
+    columns['_countback'] = countbacks
+    return columns, round_cols
+
+
+def _cache_path(input_path: str, out_dir: str) -> str:
+    """Return the cache file for the current version of `input_path`.
+
+    The name is `<path hash>-<state hash>`: the second part covers mtime,
+    size and `_CACHE_VERSION`, so editing the workbook simply misses the
+    old entry, and the shared prefix lets `_store_cache` prune it.
+    """
+    st = os.stat(input_path)
+    path_key = hashlib.blake2b(os.path.abspath(input_path).encode(), digest_size=8).hexdigest()
+    state = f"{_CACHE_VERSION}:{st.st_mtime_ns}:{st.st_size}"
+    state_key = hashlib.blake2b(state.encode(), digest_size=8).hexdigest()
+    ext = '.pkl.zst' if zstd is not None else '.pkl'
+    return os.path.join(out_dir, '.cache', f'{path_key}-{state_key}{ext}')
+
+
+def _load_cache(path: str) -> Optional[tuple]:
+    try:
+        with open(path, 'rb') as fh:
+            data = fh.read()
+        if zstd is not None:
+            data = zstd.ZstdDecompressor().decompress(data)
+        return pickle.loads(data)
+    except Exception:
+        # missing, truncated or foreign cache files are just a miss
+        return None
+
+
+def _store_cache(path: str, value: tuple) -> None:
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    if zstd is not None:
+        data = zstd.ZstdCompressor().compress(data)
+    cache_dir, name = os.path.split(path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # write to a temp file and rename so readers never see a partial cache
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            os.unlink(tmp)
+            raise
+        # drop entries for earlier versions of the same workbook
+        prefix = name.split('-', 1)[0] + '-'
+        for old in os.listdir(cache_dir):
+            if old.startswith(prefix) and old != name:
+                os.unlink(os.path.join(cache_dir, old))
+    except OSError:
+        # caching is best-effort; the outputs are still written
+        pass
+
+
+def run(input_path: str, out_dir: str, use_cache: bool = True) -> Dict[str, Any]:
+    """Process `input_path` and write the normalized CSV/JSON into `out_dir`.
+
+    Parsed and derived columns are cached under `out_dir/.cache`, keyed by
+    the workbook's path, mtime and size, so re-running on an unchanged file
+    skips the XLSX parse. Pass `use_cache=False` to always re-parse.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    cache_path = _cache_path(input_path, out_dir) if use_cache else None
+    cached = _load_cache(cache_path) if cache_path else None
+    if cached is not None:
+        # unpickled strings are not interned; restore the shared header keys
+        columns = {sys.intern(k): v for k, v in cached[0].items()}
+        round_cols = [sys.intern(h) for h in cached[1]]
+    else:
+        columns, round_cols = _prepare_columns(input_path)
+        if cache_path:
+            _store_cache(cache_path, (columns, round_cols))
+
+    # rows are only materialized once the column-wise work is done
+    norm = _build_rows(columns)
 
     # write outputs
     csv_path = os.path.join(out_dir, 'leaderboard_normalized.csv')
@@ -260,75 +574,78 @@ def run(input_path: str, out_dir: str) -> Dict[str, Any]:
 
     # write CSV header from keys
     keys = list(norm[0].keys()) + ['computed_rounds_total', 'computed_rounds_count']
-    with open(csv_path, 'w', encoding='utf-8') as fh:
-        fh.write(','.join(keys) + '\n')
-        for r in norm:
-            rowvals = [str(r.get(k)) if r.get(k) is not None else '' for k in keys]
-            fh.write(','.join(rowvals) + '\n')
-
-    with open(json_path, 'w', encoding='utf-8') as fh:
-        json.dump({'rows': norm, 'round_columns': round_cols}, fh, indent=2)
+    with open(csv_path, 'w', newline='', encoding='utf-8', buffering=_WRITE_BUFFER) as fh:
+        # csv.writer quotes values containing commas and writes None as ''
+        w = csv.writer(fh, lineterminator='\n')
+        w.writerow(keys)
+        w.writerows([r.get(k) for k in keys] for r in norm)
+
+    data = None
+    if orjson is not None:
+        try:
+            # passthrough so '_'-prefixed fields are kept, as with dict rows
+            data = orjson.dumps({'rows': norm, 'round_columns': round_cols}, default=_row_as_dict, option=orjson.OPT_INDENT_2 | orjson.OPT_PASSTHROUGH_DATACLASS)
+        except (orjson.JSONEncodeError, TypeError):
+            # e.g. an int wider than 64 bits; the stdlib encoder handles it
+            data = None
+    if data is not None:
+        with open(json_path, 'wb') as fh:
+            fh.write(data)
+    else:
+        # orjson writes non-finite floats as null; do the same here rather
+        # than emitting the non-standard NaN/Infinity tokens
+        rows = [{k: _json_value(v) for k, v in r.items()} for r in norm]
+        # json.dump emits many small chunks; let the buffer batch them
+        with open(json_path, 'w', encoding='utf-8', buffering=_WRITE_BUFFER) as fh:
+            json.dump({'rows': rows, 'round_columns': round_cols}, fh, indent=2, ensure_ascii=False, allow_nan=False)
 
     return {'csv': csv_path, 'json': json_path, 'rows': len(norm), 'round_columns': round_cols}
 
 
-def _compare_rows(a: Dict[str, Any], b: Dict[str, Any]) -> int:
-    # total descending
-    if a.get('_rank_total', 0.0) != b.get('_rank_total', 0.0):
-        return -1 if a['_rank_total'] > b['_rank_total'] else 1
-    # spending ascending (lower spend wins)
-    if a.get('_rank_spend', 0.0) != b.get('_rank_spend', 0.0):
-        return -1 if a['_rank_spend'] < b['_rank_spend'] else 1
-    # countback: compare sorted score lists lexicographically
-    al = a.get('_countback', [])
-    bl = b.get('_countback', [])
-    L = max(len(al), len(bl))
-    for i in range(L):
-        av = al[i] if i < len(al) else 0.0
-        bv = bl[i] if i < len(bl) else 0.0
-        if av != bv:
-            return -1 if av > bv else 1
-    # numeric tiebreakers equal
-    return 0
+def _rank_key(r: Dict[str, Any], width: int = 0) -> tuple:
+    """Return the ranking key of a row, rounded to absorb float noise.
+
+    The key sorts ascending into finishing order: total descending, spend
+    ascending, then countback (scores descending) compared lexicographically.
+    Countback is zero-padded to `width` so rows with fewer rounds compare as
+    if the missing rounds scored 0.
+    """
+    countback = [-round(x, 6) for x in r.get('_countback', [])]
+    countback.extend([0.0] * (width - len(countback)))
+    return (-round(float(r.get('_rank_total', 0.0)), 6), round(float(r.get('_rank_spend', 0.0)), 6), tuple(countback))
 
 
 def rank_rows(norm: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Sort and annotate rows with `rank`, `tie_group`, and `tie_highlight`.
 
-    Expects each row to already have `_rank_total`, `_rank_spend`, and `_countback` fields.
+    Rows may be dicts or the slotted rows built by `run`; each is expected
+    to already have `_rank_total`, `_rank_spend`, and `_countback` fields.
     Returns a new list (sorted) with rank metadata added in-place.
     """
-    # Sort using comparator but keep deterministic alphabetical order for stable output
-    norm_sorted = sorted(norm, key=cmp_to_key(lambda a, b: _compare_rows(a, b) or (-1 if (a.get('Player') or '') < (b.get('Player') or '') else 1)))
+    # each key is computed once per call, kept parallel to `norm` rather
+    # than stored on the rows, with every countback padded to one width
+    width = max((len(r.get('_countback', [])) for r in norm), default=0)
+    keys = [_rank_key(r, width) for r in norm]
 
-    def key_for(r: Dict[str, Any]) -> tuple:
-        return (round(float(r.get('_rank_total', 0.0)), 6), round(float(r.get('_rank_spend', 0.0)), 6), tuple([round(x, 6) for x in r.get('_countback', [])]))
+    # Sort by key but keep deterministic alphabetical order for stable output
+    order = sorted(range(len(norm)), key=lambda i: (keys[i], norm[i].get('Player') or ''))
 
-    counts: Dict[tuple, int] = Counter(key_for(r) for r in norm_sorted)
+    # rows sharing a key are adjacent after sorting, so one pass assigns
+    # ranks and tie groups without hashing every key
     tie_group_id = 0
-    group_map: Dict[tuple, int] = {}
-    for idx, r in enumerate(norm_sorted):
-        k = key_for(r)
-        if k not in group_map and counts[k] > 1:
+    idx = 0
+    for _, grp in groupby(order, key=keys.__getitem__):
+        grp = [norm[i] for i in grp]
+        tied = len(grp) > 1
+        if tied:
             tie_group_id += 1
-            group_map[k] = tie_group_id
-        if idx == 0:
-            r['rank'] = 1
-        else:
-            prev = norm_sorted[idx - 1]
-            if key_for(prev) == k:
-                r['rank'] = prev['rank']
-            else:
-                r['rank'] = idx + 1
-        # tie metadata
-        if counts[k] > 1:
-            r['tie_group'] = group_map[k]
-            r['tie_highlight'] = True
-        else:
-            r['tie_group'] = None
-            r['tie_highlight'] = False
-
-    return norm_sorted
+        for r in grp:
+            r['rank'] = idx + 1
+            r['tie_group'] = tie_group_id if tied else None
+            r['tie_highlight'] = tied
+        idx += len(grp)
+
+    return [norm[i] for i in order]
 
     
 
@@ -337,12 +654,13 @@ def main():
     p = argparse.ArgumentParser()
     p.add_argument('--input', '-i', default='leaderboard.xlsx', help='Path to leaderboard.xlsx')
     p.add_argument('--out', '-o', default='Test2/output', help='Output directory')
+    p.add_argument('--no-cache', action='store_true', help='Always re-parse the workbook instead of using the cache')
     args = p.parse_args()
     inp = args.input
     # if relative, resolve from workspace root
     if not os.path.isabs(inp):
         inp = os.path.join(os.getcwd(), inp)
-    result = run(inp, args.out)
+    result = run(inp, args.out, use_cache=not args.no_cache)
     print('Wrote:', result['csv'], result['json'])
 
 
@@ -1,7 +1,35 @@
 import os
+import csv
 import json
+import xml.etree.ElementTree as StdET
+import zipfile
+import pytest
+from xml.sax.saxutils import escape
 from Test2 import process_leaderboard
 
+NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+
+
+def write_xlsx(path, rows, shared=()):
+    """Write a minimal workbook; str cells are inline strings, ('s', idx) shared refs."""
+    def cell(ref, v):
+        if isinstance(v, tuple):
+            return f'<c r="{ref}" t="s"><v>{v[1]}</v></c>'
+        if isinstance(v, str):
+            return f'<c r="{ref}" t="inlineStr"><is><t>{escape(v)}</t></is></c>'
+        return f'<c r="{ref}"><v>{v}</v></c>'
+
+    body = ''.join(
+        f'<row r="{i}">' + ''.join(cell(f'{chr(65 + j)}{i}', v) for j, v in enumerate(row) if v is not None) + '</row>'
+        for i, row in enumerate(rows, start=1)
+    )
+    with zipfile.ZipFile(path, 'w') as z:
+        z.writestr('xl/worksheets/sheet1.xml', f'<worksheet xmlns="{NS}"><sheetData>{body}</sheetData></worksheet>')
+        if shared:
+            items = ''.join(f'<si><t>{escape(t)}</t></si>' for t in shared)
+            z.writestr('xl/sharedStrings.xml', f'<sst xmlns="{NS}">{items}</sst>')
+    return str(path)
+
 
 def test_parse_and_write(tmp_path):
     workspace = os.getcwd()
@@ -15,3 +43,171 @@ def test_parse_and_write(tmp_path):
     with open(res['json'], 'r', encoding='utf-8') as fh:
         j = json.load(fh)
         assert 'rows' in j and isinstance(j['rows'], list)
+
+
+def test_normalize_columns_matches_rows():
+    rows = [
+        {'A': 'Pos', 'B': 'Player', 'C': 'R01'},
+        {'A': '1', 'B': 'Alpha', 'C': '12.5'},
+        {'A': '2', 'B': 'Beta', 'C': '-'},
+    ]
+    cols = process_leaderboard.normalize_columns(rows)
+    assert cols == {'Pos': [1, 2], 'Player': ['Alpha', 'Beta'], 'R01': [12.5, None]}
+    assert process_leaderboard.normalize_rows(rows) == [
+        {'Pos': 1, 'Player': 'Alpha', 'R01': 12.5},
+        {'Pos': 2, 'Player': 'Beta', 'R01': None},
+    ]
+
+
+def test_run_reuses_cache(tmp_path, monkeypatch):
+    src = write_xlsx(tmp_path / 'in.xlsx', [['Pos', 'Player', 'R01'], [1, 'Alpha', 10]])
+    out = str(tmp_path / 'out')
+    first = process_leaderboard.run(src, out)
+    with open(first['json'], 'rb') as fh:
+        expected = fh.read()
+
+    def fail(input_path):
+        raise AssertionError('cache miss: workbook was re-parsed')
+
+    monkeypatch.setattr(process_leaderboard, '_prepare_columns', fail)
+    second = process_leaderboard.run(src, out)
+    assert second['rows'] == first['rows']
+    with open(second['json'], 'rb') as fh:
+        assert fh.read() == expected
+
+
+def test_cache_invalidated_and_pruned_when_workbook_changes(tmp_path, monkeypatch):
+    src = write_xlsx(tmp_path / 'in.xlsx', [['Pos', 'Player', 'R01'], [1, 'Alpha', 10]])
+    out = str(tmp_path / 'out')
+    process_leaderboard.run(src, out)
+    cache_dir = os.path.join(out, '.cache')
+    before = os.listdir(cache_dir)
+
+    st = os.stat(src)
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    parsed = []
+    real = process_leaderboard._prepare_columns
+    monkeypatch.setattr(process_leaderboard, '_prepare_columns', lambda p: parsed.append(p) or real(p))
+    process_leaderboard.run(src, out)
+
+    assert parsed == [src]
+    after = os.listdir(cache_dir)
+    assert len(after) == 1 and after != before
+
+
+def test_stdlib_parser_matches(tmp_path, monkeypatch):
+    src = os.path.join(os.getcwd(), 'leaderboard.xlsx')
+    expected = process_leaderboard.normalize_columns(process_leaderboard.parse_xlsx_to_rows(src))
+    monkeypatch.setattr(process_leaderboard, 'ET', StdET)
+    monkeypatch.setattr(process_leaderboard, '_HAVE_LXML', False)
+    monkeypatch.setattr(process_leaderboard, '_ITERPARSE_OPTS', {})
+    assert process_leaderboard.normalize_columns(process_leaderboard.parse_xlsx_to_rows(src)) == expected
+
+
+def test_shared_string_index_out_of_range_keeps_text(tmp_path):
+    src = write_xlsx(tmp_path / 'in.xlsx', [[('s', 0), ('s', -1), ('s', 5)]], shared=['Pos'])
+    rows = list(process_leaderboard.parse_xlsx_to_rows(src))
+    assert rows == [{'A': 'Pos', 'B': '-1', 'C': '5'}]
+
+
+
+def test_external_entities_are_not_expanded(tmp_path):
+    secret = tmp_path / 'secret.txt'
+    secret.write_text('TOP-SECRET')
+    src = write_xlsx(tmp_path / 'in.xlsx', [[('s', 0)], [1]])
+    with zipfile.ZipFile(src, 'a') as z:
+        z.writestr('xl/sharedStrings.xml', (
+            f'<!DOCTYPE sst [<!ENTITY x SYSTEM "{secret.as_uri()}">]>'
+            f'<sst xmlns="{NS}"><si><t>Pos&x;</t></si></sst>'
+        ))
+    try:
+        rows = list(process_leaderboard.parse_xlsx_to_rows(src))
+    except Exception:
+        # refusing the document outright is fine too
+        return
+    assert 'TOP-SECRET' not in repr(rows)
+
+
+ROUND_COLUMNS = {
+    'R01': [1.5, 12345678901234567890123, None, 'D$Q'],
+    'R02': [1.5, 1, 7, '2.5'],
+}
+
+
+def test_round_stats_totals_keep_baseline_types():
+    computed, countbacks = process_leaderboard._round_stats(ROUND_COLUMNS, 4, ['R01', 'R02'])
+    assert computed == [3.0, 12345678901234567890124, 7, 2.5]
+    assert [type(x) for x in computed] == [float, int, int, float]
+    assert countbacks[2] == (7.0, 0.0)
+
+
+def test_round_stats_numpy_matches_python(monkeypatch):
+    with_numpy = process_leaderboard._round_stats(ROUND_COLUMNS, 4, ['R01', 'R02'])
+    monkeypatch.setattr(process_leaderboard, 'np', None)
+    assert process_leaderboard._round_stats(ROUND_COLUMNS, 4, ['R01', 'R02']) == with_numpy
+
+
+def test_rank_inputs_only_numeric_totals_count():
+    columns = {'Total': [10, '+5', 'inf', None], 'Spent': ['1,000', '$2.5', 'n/a', None]}
+    totals, spends = process_leaderboard._rank_inputs(columns, [1, 2, 3, None], 'Total', 'Spent')
+    assert totals == [10.0, 2.0, 3.0, 0.0]
+    assert spends == [1000.0, 2.5, 0.0, 0.0]
+
+
+def test_csv_quotes_commas_and_quotes(tmp_path):
+    src = write_xlsx(tmp_path / 'in.xlsx', [
+        ['Pos', 'Player', 'R01', 'R02'],
+        [1, 'Smith, "Jo"', 10, 5],
+    ])
+    res = process_leaderboard.run(src, str(tmp_path / 'out'), use_cache=False)
+    with open(res['csv'], newline='', encoding='utf-8') as fh:
+        header, row = list(csv.reader(fh))
+    assert len(row) == len(header)
+    assert row[header.index('Player')] == 'Smith, "Jo"'
+    assert row[header.index('_countback')] == '(10.0, 5.0)'
+
+
+def test_json_fallback_and_non_finite_policy(tmp_path, monkeypatch):
+    src = write_xlsx(tmp_path / 'in.xlsx', [
+        ['Pos', 'Player', 'R01', 'R02'],
+        [1, 'Big', 12345678901234567890123, 1],
+        [2, 'Neg', '-inf', 3],
+    ])
+    res = process_leaderboard.run(src, str(tmp_path / 'a'), use_cache=False)
+    with open(res['json'], encoding='utf-8') as fh:
+        default = json.load(fh)
+    monkeypatch.setattr(process_leaderboard, 'orjson', None)
+    res = process_leaderboard.run(src, str(tmp_path / 'b'), use_cache=False)
+    with open(res['json'], encoding='utf-8') as fh:
+        stdlib = json.load(fh)
+
+    assert default == stdlib
+    rows = {r['Player']: r for r in default['rows']}
+    assert rows['Big']['R01'] == 12345678901234567890123
+    assert rows['Neg']['computed_rounds_total'] is None
+    assert rows['Neg']['_countback'] == [3.0, None]
+
+
+def test_normalize_numeric_conversion_is_strict():
+    cells = ['12', '-3', '1.5', '-0.25', '1e3', '1_000', '1.', '-inf', '-nan', '+5']
+    rows = [{'A': 'v'}] + [{'A': c} for c in cells]
+    assert process_leaderboard.normalize_columns(rows)['v'] == [
+        12, -3, 1.5, -0.25, '1e3', '1_000', '1.', '-inf', '-nan', '+5',
+    ]
+
+
+def test_slot_row_only_exposes_fields():
+    rows = process_leaderboard._build_rows({'Player': ['Alpha'], 'Total': [10]})
+    row = rows[0]
+    assert row.get('Player') == 'Alpha' and 'Total' in row
+    assert row.get('keys') is None and row.get('items', 'x') == 'x'
+    assert 'items' not in row and 'get' not in row
+    with pytest.raises(KeyError):
+        row['keys']
+    assert '_key' not in row
+
+
+def test_dict_rows_before_python_310(monkeypatch):
+    monkeypatch.setattr(process_leaderboard.sys, 'version_info', (3, 9, 18))
+    rows = process_leaderboard._build_rows({'Player': ['Alpha'], 'Total': [10]})
+    assert rows == [{'Player': 'Alpha', 'Total': 10}]
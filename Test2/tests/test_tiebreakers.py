@@ -48,3 +48,33 @@ def test_full_tie_alphabetical():
     assert out[0]['rank'] == out[1]['rank']
     assert out[0]['tie_group'] == out[1]['tie_group']
     assert out[0]['tie_highlight'] is True
+
+
+def test_countback_missing_rounds_count_as_zero():
+    # Beta has an extra positive round; Alpha's missing round counts as 0
+    a = make_row('Alpha', 100.0, 10.0, [60, 40])
+    b = make_row('Beta', 100.0, 10.0, [60, 40, 10])
+    out = rank_rows([a, b])
+    assert out[0]['Player'] == 'Beta'
+    assert out[1]['rank'] == 2
+
+
+def test_rerank_after_total_changes():
+    a = make_row('Alpha', 100.0, 10.0, [100])
+    b = make_row('Beta', 90.0, 10.0, [90])
+    assert [r['Player'] for r in rank_rows([a, b])] == ['Alpha', 'Beta']
+    b['_rank_total'] = 200.0
+    out = rank_rows([a, b])
+    assert [r['Player'] for r in out] == ['Beta', 'Alpha']
+    assert out[0]['rank'] == 1 and out[1]['rank'] == 2
+    assert '_key' not in a and '_key' not in b
+
+
+def test_reranked_rows_pad_with_new_rows():
+    # Alpha was ranked alone first; mixing it with Beta must still pad
+    a = make_row('Alpha', 100.0, 10.0, [60, 40])
+    rank_rows([a])
+    b = make_row('Beta', 100.0, 10.0, [60, 40, 10])
+    out = rank_rows([a, b])
+    assert out[0]['Player'] == 'Beta'
+    assert out[1]['rank'] == 2